@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 
 import argparse
+import functools
 import os
 import sys
 import importlib
+import importlib.util
 import pkgutil
 import glob
 import shlex
@@ -78,30 +80,39 @@ def load_vars_files(varset, vars_dir, patterns, allow_var_references=True):
         varset.read_vars_file(vars_file, allow_var_references=allow_var_references)
 
 
-def load_output_plugins(varset, output_dir, config_version):
+@functools.lru_cache()
+def discover_plugin_classes(plugin_dirs):
     '''
-    Find, import, and instantiate all output plugins
+    Find and import output plugin classes from the given dirs
+
+    The result is cached, so that the plugin dirs are only scanned and the plugin
+    modules only imported once, even if main() is invoked multiple times
     '''
-    plugins = []
-    for plugin_dir in (output_ns.__path__ + SITE_CONFIG.plugin_dirs):
+    classes = {}
+    for plugin_dir in plugin_dirs:
         DISPLAY.vv('Looking in plugin dir %s' % plugin_dir)
-        sys.path.insert(0, plugin_dir)
+        # Built-in plugins are imported as part of our package, so that modules they
+        # share (such as kube_common) are only loaded once
+        builtin = (plugin_dir in output_ns.__path__)
+        if not builtin:
+            # Allow plugins to import other modules from the same dir
+            sys.path.insert(0, plugin_dir)
         for finder, name, ispkg in pkgutil.iter_modules([plugin_dir]):
+            # Modules with a leading underscore are helpers rather than plugins, so
+            # don't bother importing them
+            if name.startswith('_'):
+                continue
             try:
-                # Look through already loaded plugins for the same name
-                found_plugin = False
-                for idx, plugin in enumerate(plugins):
-                    if plugin.NAME == name:
-                        # Remove already loaded plugin in favor of the one we're about to load
-                        plugins.pop(idx)
-                        found_plugin = True
-                        break
-                # Import plugin
-                mod = importlib.import_module(name)
-                # Reload module if we had already loaded one of the same name
-                # This is necessary because import_module() returns the cached module
-                if found_plugin:
-                    mod = importlib.reload(mod)
+                if builtin:
+                    mod = importlib.import_module('%s.%s' % (output_ns.__name__, name))
+                else:
+                    # Import plugin directly from the finder for the plugin dir. This
+                    # replaces any already loaded module of the same name, which allows
+                    # plugins in later dirs to override those in earlier dirs
+                    spec = finder.find_spec(name)
+                    mod = importlib.util.module_from_spec(spec)
+                    sys.modules[name] = mod
+                    spec.loader.exec_module(mod)
                 # Get class object
                 cls = getattr(mod, 'OutputPlugin')
                 # Verify that output plugin NAME attribute matches file name
@@ -109,17 +120,35 @@ def load_output_plugins(varset, output_dir, config_version):
                 # that assumption here
                 if cls.NAME != name:
                     raise Exception('name specified in OutputPlugin class (%s) does not match file name (%s)' % (cls.NAME, name))
-                DISPLAY.v('Loading plugin %s' % name)
-                # Instantiate plugin class
-                plugins.append(cls(varset, output_dir, config_version))
-            except ConfigError as e:
-                DISPLAY.display('Plugin configuration error: %s: %s' % (name, str(e)))
-                sys.exit(1)
+                # Remove already loaded plugin in favor of the one we just loaded
+                classes.pop(name, None)
+                classes[name] = cls
             except Exception as e:
                 show_traceback(DISPLAY.get_verbosity())
                 DISPLAY.display('Failed to load output plugin %s: %s' % (name, str(e)))
                 sys.exit(1)
-        sys.path.pop(0)
+        if not builtin:
+            sys.path.pop(0)
+    return list(classes.values())
+
+
+def load_output_plugins(varset, output_dir, config_version):
+    '''
+    Find, import, and instantiate all output plugins
+    '''
+    plugins = []
+    for cls in discover_plugin_classes(tuple(output_ns.__path__ + SITE_CONFIG.plugin_dirs)):
+        try:
+            DISPLAY.v('Loading plugin %s' % cls.NAME)
+            # Instantiate plugin class
+            plugins.append(cls(varset, output_dir, config_version))
+        except ConfigError as e:
+            DISPLAY.display('Plugin configuration error: %s: %s' % (cls.NAME, str(e)))
+            sys.exit(1)
+        except Exception as e:
+            show_traceback(DISPLAY.get_verbosity())
+            DISPLAY.display('Failed to load output plugin %s: %s' % (cls.NAME, str(e)))
+            sys.exit(1)
     # Return list of plugins sorted by priority (highest to lowest) and name (Z-A, because
     # we reverse the sort)
     return sorted(plugins, reverse=True)
@@ -133,31 +162,31 @@ def app_validate_fields(app, app_index, output_plugins):
             if plugin.is_needed(app):
                 plugins_used.append(plugin.NAME)
                 plugin_unmatched = plugin.validate_fields(app)
-                unmatched[plugin.NAME] = plugin_unmatched
+                # Use a set for quick lookups when comparing against other plugins
+                unmatched[plugin.NAME] = set(plugin_unmatched)
         # Compare unmatched from all plugins and compile final list
         # We are looking for fields that were unmatched by all active plugins,
         # with the added twist that we need to match what may be an unmatched
         # sub-field in one plugin and a top-level field in another.
-        final_unmatched = []
+        final_unmatched = set()
         for plugin in unmatched:
             for entry in unmatched[plugin]:
+                # Build list of the entry itself and all of its parent fields
+                # (e.g. 'foo.bar.baz', 'foo.bar', 'foo')
+                entry_parts = entry.split('.')
+                entry_candidates = ['.'.join(entry_parts[:idx]) for idx in range(len(entry_parts), 0, -1)]
+                # Check entry against unmatched entries from other plugins, looking
+                # for an exact match or a parent/sub-field match
                 entry_keep = True
-                # Check entry against unmatched entries from other plugins
                 for plugin2 in unmatched:
                     if plugin2 == plugin:
                         continue
-                    plugin2_matched = False
-                    for entry2 in unmatched[plugin2]:
-                        # Check for exact match or a parent/sub-field match
-                        if entry2 == entry or entry.startswith('%s.' % entry2):
-                            plugin2_matched = True
-                            break
-                    if not plugin2_matched:
+                    if not any(candidate in unmatched[plugin2] for candidate in entry_candidates):
                         entry_keep = False
                         break
                 # Add entry to final list if it existed for all plugins
-                if entry_keep and entry not in final_unmatched:
-                    final_unmatched.append(entry)
+                if entry_keep:
+                    final_unmatched.add(entry)
         if final_unmatched:
             raise DeployConfigError('found the following unknown fields: %s' % ', '.join(sorted(final_unmatched)))
         if not plugins_used:
@@ -232,10 +261,13 @@ def main():
             show_traceback(DISPLAY.get_verbosity())
             sys.exit(1)
 
-    DISPLAY.vvvv('Site config:')
-    DISPLAY.vvvv()
-    DISPLAY.vvvv(yaml_dump(SITE_CONFIG.get_config()))
-    DISPLAY.vvvv()
+    # Only dump config/vars when they'll actually be displayed, since generating
+    # the YAML isn't free
+    if DISPLAY.get_verbosity() >= 4:
+        DISPLAY.vvvv('Site config:')
+        DISPLAY.vvvv()
+        DISPLAY.vvvv(yaml_dump(SITE_CONFIG.get_config()))
+        DISPLAY.vvvv()
 
     varset = Vars()
     varset['env'] = args.env
@@ -258,10 +290,11 @@ def main():
             print('%s=%s' % (key, shlex.quote(templated_vars[key])))
         sys.exit(0)
 
-    DISPLAY.vvvv()
-    DISPLAY.vvvv('Vars:')
-    DISPLAY.vvvv()
-    DISPLAY.vvvv(yaml_dump(dict(varset), indent=2))
+    if DISPLAY.get_verbosity() >= 4:
+        DISPLAY.vvvv()
+        DISPLAY.vvvv('Vars:')
+        DISPLAY.vvvv()
+        DISPLAY.vvvv(yaml_dump(dict(varset), indent=2))
 
     try:
         deploy_config = DeployConfig(os.path.join(deploy_dir, SITE_CONFIG.deploy_config_file), varset)
@@ -275,9 +308,10 @@ def main():
         show_traceback(DISPLAY.get_verbosity())
         sys.exit(1)
 
-    DISPLAY.vvvv('Deploy config:')
-    DISPLAY.vvvv()
-    DISPLAY.vvvv(yaml_dump(deploy_config.get_config(), indent=2))
+    if DISPLAY.get_verbosity() >= 4:
+        DISPLAY.vvvv('Deploy config:')
+        DISPLAY.vvvv()
+        DISPLAY.vvvv(yaml_dump(deploy_config.get_config(), indent=2))
 
     deploy_config_version = deploy_config.get_version() or SITE_CONFIG.default_config_version
     output_plugins = load_output_plugins(varset, args.output_dir, deploy_config_version)
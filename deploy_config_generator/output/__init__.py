@@ -67,6 +67,8 @@ class OutputPluginBase(object):
         self._plugin_config.update(self.DEFAULT_CONFIG)
         # Helper var to tidy up the code
         self._fields = copy.deepcopy(self._plugin_config['fields'])
+        # Cached required fields for each section (see get_required_fields())
+        self._required_fields = {}
         # Convert field definitions into PluginField objects
         for section in self._fields:
             section_fields = self._fields[section]
@@ -122,14 +124,20 @@ class OutputPluginBase(object):
 
     def get_required_fields(self):
         '''
-        Return a list of fields in the current section with required=True
+        Return a tuple of fields in the current section with required=True
         '''
-        ret = []
-        if self._section in self._fields:
-            for k, v in self._fields[self._section].items():
-                if v.required and v.default is None and v.is_valid_for_config_version():
-                    ret.append(k)
-        return ret
+        # The field definitions don't change once the plugin config is built, but
+        # this gets called for every app (via is_needed()), so cache the result
+        # for each section
+        if self._section not in self._required_fields:
+            ret = []
+            if self._section in self._fields:
+                for k, v in self._fields[self._section].items():
+                    if v.required and v.default is None and v.is_valid_for_config_version():
+                        ret.append(k)
+            # Store as a tuple so that callers can't modify the cached value
+            self._required_fields[self._section] = tuple(ret)
+        return self._required_fields[self._section]
 
     def is_field_locked(self, field):
         '''
@@ -262,6 +270,8 @@ class PluginField(object):
     _name = None
     _config = None
     _parent = None
+    # Cached result of has_conditionals()
+    _has_conditionals = None
     _config_version = None
 
     BASE_CONFIG = {
@@ -365,6 +375,7 @@ class PluginField(object):
         '''
         Deep merge field attributes from site config with current config
         '''
+        self.reset_has_conditionals()
         for k, v in config.items():
             if k == 'fields':
                 for field_name, field in v.items():
@@ -627,6 +638,28 @@ class PluginField(object):
                 ret = value
         return ret
 
+    def has_conditionals(self):
+        '''
+        Check whether this field or any of its sub-fields support a conditional
+        '''
+        # This gets called for every list value that's checked, so only walk the
+        # sub-fields once
+        if self._has_conditionals is None:
+            ret = bool(self.conditional)
+            if not ret and self.fields is not None:
+                ret = any(field.has_conditionals() for field in self.fields.values())
+            self._has_conditionals = ret
+        return self._has_conditionals
+
+    def reset_has_conditionals(self):
+        '''
+        Clear cached has_conditionals() result for this field and its parents
+        '''
+        field = self
+        while field is not None:
+            field._has_conditionals = None
+            field = field._parent
+
     def check_conditionals(self, value, app_vars, use_subtype=False):
         '''
         Check conditionals and filter value
@@ -638,8 +671,11 @@ class PluginField(object):
             field_type = self.subtype
         if field_type == 'list':
             ret = []
+            # The loop vars are only used when evaluating conditionals, so don't bother
+            # making a copy of the vars for each item if there aren't any
+            use_loop_var = (self.loop_var and self.has_conditionals())
             for idx, item in enumerate(value):
-                if self.loop_var:
+                if use_loop_var:
                     # Add loop item and index vars
                     app_vars = app_vars.copy()
                     app_vars.update({self.loop_var: item, ('%s_index' % self.loop_var): idx})
@@ -2,12 +2,33 @@ from deploy_config_generator.utils import json_dump, underscore_to_camelcase
 from deploy_config_generator.output import OutputPluginBase
 
 
+def camelcase_pairs(*fields):
+    '''
+    Build (field name, camel case field name) pairs for the given field names
+    '''
+    return tuple((field, underscore_to_camelcase(field)) for field in fields)
+
+
 class OutputPlugin(OutputPluginBase):
 
     NAME = 'marathon'
     DESCR = 'Marathon output plugin'
     FILE_EXT = '.json'
 
+    # (field name, output field name) pairs for fields copied into the output by
+    # the various builders
+    MISC_FIELDS = camelcase_pairs('labels', 'args', 'cmd', 'accepted_resource_roles')
+    VOLUME_FIELDS = camelcase_pairs('container_path', 'host_path', 'mode')
+    PERSISTENT_VOLUME_FIELDS = camelcase_pairs('type', 'size', 'profile_name', 'max_size')
+    PORT_MAPPING_FIELDS = camelcase_pairs('container_port', 'host_port', 'service_port')
+    PORT_DEFINITION_FIELDS = camelcase_pairs('name', 'protocol')
+    HEALTH_CHECK_FIELDS = camelcase_pairs('grace_period_seconds', 'interval_seconds', 'timeout_seconds', 'delay_seconds',
+                                          'max_consecutive_failures', 'path', 'port_index', 'port', 'protocol')
+    UPGRADE_STRATEGY_FIELDS = camelcase_pairs('minimum_health_capacity', 'maximum_over_capacity')
+    UNREACHABLE_STRATEGY_FIELDS = camelcase_pairs('inactive_after_seconds', 'expunge_after_seconds')
+    # Fetch fields are copied into the output as-is
+    FETCH_FIELDS = ('uri', 'executable', 'cache', 'extract')
+
     DEFAULT_CONFIG = {
         'fields': {
             'apps': {
@@ -323,9 +344,12 @@ class OutputPlugin(OutputPluginBase):
         # Constraints
         if app_vars['APP']['constraints']:
             data['constraints'] = app_vars['APP']['constraints']
+        # Scratch copy of vars shared by the builders below, which set their
+        # own loop vars in it when rendering templates
+        tmp_vars = app_vars.copy()
         # Ports
-        self.build_port_mappings(app_vars, data)
-        self.build_port_definitions(app_vars, data)
+        self.build_port_mappings(app_vars, data, tmp_vars)
+        self.build_port_definitions(app_vars, data, tmp_vars)
         # Container labels
         self.build_container_labels(app_vars, data)
         # Networks
@@ -336,22 +360,31 @@ class OutputPlugin(OutputPluginBase):
         if app_vars['APP']['env'] is not None:
             data['env'] = app_vars['APP']['env']
         # Secrets
-        self.build_secrets(app_vars, data)
+        self.build_secrets(app_vars, data, tmp_vars)
         # Fetch config
-        self.build_fetch_config(app_vars, data)
+        self.build_fetch_config(app_vars, data, tmp_vars)
         # Health checks
-        self.build_health_checks(app_vars, data)
+        self.build_health_checks(app_vars, data, tmp_vars)
         # Upgrade/unreachable strategies
         self.build_upgrade_strategy(app_vars, data)
         self.build_unreachable_strategy(app_vars, data)
         # Misc attributes
-        for field in ('labels', 'args', 'cmd', 'accepted_resource_roles'):
+        for field, output_field in self.MISC_FIELDS:
             if app_vars['APP'][field]:
-                data[underscore_to_camelcase(field)] = app_vars['APP'][field]
+                data[output_field] = app_vars['APP'][field]
 
         output = json_dump(self._template.render_template(data, app_vars))
         return output
 
+    def clear_loop_vars(self, tmp_vars, *names):
+        '''
+        Remove loop vars (and their matching index vars) from the shared scratch
+        vars, so that they aren't visible to templates in other builders
+        '''
+        for name in names:
+            tmp_vars.pop(name, None)
+            tmp_vars.pop('%s_index' % name, None)
+
     def build_container_labels(self, app_vars, data):
         if app_vars['APP']['container_labels'] is not None:
             container_parameters = []
@@ -363,12 +396,12 @@ class OutputPlugin(OutputPluginBase):
                 container_parameters.append(tmp_param)
             data['container']['docker']['parameters'] += container_parameters
 
-    def build_secrets(self, app_vars, data):
+    def build_secrets(self, app_vars, data, tmp_vars):
         if app_vars['APP']['secrets']:
             secrets = {}
-            tmp_vars = app_vars.copy()
             for secret_index, secret in enumerate(app_vars['APP']['secrets']):
-                tmp_vars.update(dict(secret=secret, secret_index=secret_index))
+                tmp_vars['secret'] = secret
+                tmp_vars['secret_index'] = secret_index
                 tmp_secret = {
                     'source': secret['source']
                 }
@@ -377,6 +410,7 @@ class OutputPlugin(OutputPluginBase):
                     secrets[secret['name']] = tmp_secret
             if secrets:
                 data['secrets'] = secrets
+            self.clear_loop_vars(tmp_vars, 'secret')
 
     def build_networks(self, app_vars, data):
         networks = []
@@ -402,14 +436,14 @@ class OutputPlugin(OutputPluginBase):
             volumes = []
             for volume_index, volume in enumerate(app_vars['APP']['volumes']):
                 tmp_volume = {}
-                for field in ('container_path', 'host_path', 'mode'):
+                for field, output_field in self.VOLUME_FIELDS:
                     if volume[field] is not None:
-                        tmp_volume[underscore_to_camelcase(field)] = volume[field]
+                        tmp_volume[output_field] = volume[field]
                 if volume['persistent']:
                     tmp_persistent = {}
-                    for field in ('type', 'size', 'profile_name', 'max_size'):
+                    for field, output_field in self.PERSISTENT_VOLUME_FIELDS:
                         if volume['persistent'][field] is not None:
-                            tmp_persistent[underscore_to_camelcase(field)] = volume['persistent'][field]
+                            tmp_persistent[output_field] = volume['persistent'][field]
                     if volume['persistent']['constraints']:
                         tmp_persistent['constraints'] = volume['persistent']['constraints']
                     if tmp_persistent:
@@ -417,21 +451,22 @@ class OutputPlugin(OutputPluginBase):
                 volumes.append(tmp_volume)
             data['container']['volumes'] = volumes
 
-    def build_port_mappings(self, app_vars, data):
+    def build_port_mappings(self, app_vars, data, tmp_vars):
         port_mappings = []
-        tmp_vars = app_vars.copy()
         for port_index, port in enumerate(app_vars['APP']['ports']):
-            tmp_vars.update(dict(port=port, port_index=port_index))
+            tmp_vars['port'] = port
+            tmp_vars['port_index'] = port_index
             tmp_port = {
                 "protocol": port['protocol'],
             }
-            for field in ('container_port', 'host_port', 'service_port'):
+            for field, output_field in self.PORT_MAPPING_FIELDS:
                 if port[field] is not None:
-                    tmp_port[underscore_to_camelcase(field)] = int(port[field])
+                    tmp_port[output_field] = int(port[field])
             # Port labels
             port_labels = {}
             for label_index, label in enumerate(port['labels']):
-                tmp_vars.update(dict(label=label, label_index=label_index))
+                tmp_vars['label'] = label
+                tmp_vars['label_index'] = label_index
                 if label['condition'] is None or self._template.evaluate_condition(label['condition'], tmp_vars):
                     port_labels[self._template.render_template(label['name'], tmp_vars)] = self._template.render_template(label['value'], tmp_vars)
             if port_labels:
@@ -439,24 +474,26 @@ class OutputPlugin(OutputPluginBase):
             # Render templates now so that loop vars can be used
             tmp_port = self._template.render_template(tmp_port, tmp_vars)
             port_mappings.append(tmp_port)
+        self.clear_loop_vars(tmp_vars, 'port', 'label')
         if port_mappings:
             data['container']['docker']['portMappings'] = port_mappings
 
-    def build_port_definitions(self, app_vars, data):
+    def build_port_definitions(self, app_vars, data, tmp_vars):
         port_definitions = []
-        tmp_vars = app_vars.copy()
         for port_index, port in enumerate(app_vars['APP']['port_definitions']):
-            tmp_vars.update(dict(port=port, port_index=port_index))
+            tmp_vars['port'] = port
+            tmp_vars['port_index'] = port_index
             tmp_port = {
                 "port": int(port['port']),
             }
-            for field in ('name', 'protocol'):
+            for field, output_field in self.PORT_DEFINITION_FIELDS:
                 if port[field] is not None:
-                    tmp_port[underscore_to_camelcase(field)] = port[field]
+                    tmp_port[output_field] = port[field]
             # Port labels
             port_labels = {}
             for label_index, label in enumerate(port['labels']):
-                tmp_vars.update(dict(label=label, label_index=label_index))
+                tmp_vars['label'] = label
+                tmp_vars['label_index'] = label_index
                 if label['condition'] is None or self._template.evaluate_condition(label['condition'], tmp_vars):
                     port_labels[self._template.render_template(label['name'], tmp_vars)] = self._template.render_template(label['value'], tmp_vars)
             if port_labels:
@@ -464,35 +501,39 @@ class OutputPlugin(OutputPluginBase):
             # Render templates now so that loop vars can be used
             tmp_port = self._template.render_template(tmp_port, tmp_vars)
             port_definitions.append(tmp_port)
+        self.clear_loop_vars(tmp_vars, 'port', 'label')
         if port_definitions:
             data['portDefinitions'] = port_definitions
         if app_vars['APP']['require_ports'] is not None:
             data['requirePorts'] = app_vars['APP']['require_ports']
 
-    def build_fetch_config(self, app_vars, data):
+    def build_fetch_config(self, app_vars, data, tmp_vars):
         fetch_config = []
-        tmp_vars = app_vars.copy()
         for fetch_index, fetch in enumerate(app_vars['APP']['fetch']):
-            tmp_vars.update(dict(fetch=fetch, fetch_index=fetch_index))
-            if fetch['condition'] is None or self._template.evaluate_condition(fetch['condition'], tmp_vars):
-                tmp_fetch = {}
-                for field in ('uri', 'executable', 'cache', 'extract'):
-                    if fetch[field] is not None:
-                        tmp_fetch[field] = fetch[field]
-                fetch_config.append(tmp_fetch)
+            if fetch['condition'] is not None:
+                # Loop vars are only needed for evaluating the condition
+                tmp_vars['fetch'] = fetch
+                tmp_vars['fetch_index'] = fetch_index
+                if not self._template.evaluate_condition(fetch['condition'], tmp_vars):
+                    continue
+            tmp_fetch = {}
+            for field in self.FETCH_FIELDS:
+                if fetch[field] is not None:
+                    tmp_fetch[field] = fetch[field]
+            fetch_config.append(tmp_fetch)
+        self.clear_loop_vars(tmp_vars, 'fetch')
         if fetch_config:
             data['fetch'] = fetch_config
 
-    def build_health_checks(self, app_vars, data):
+    def build_health_checks(self, app_vars, data, tmp_vars):
         health_checks = []
-        tmp_vars = app_vars.copy()
         for check_index, check in enumerate(app_vars['APP']['health_checks']):
-            tmp_vars.update(dict(check=check, check_index=check_index))
+            tmp_vars['check'] = check
+            tmp_vars['check_index'] = check_index
             tmp_check = {}
-            for field in ('grace_period_seconds', 'interval_seconds', 'timeout_seconds', 'delay_seconds',
-                          'max_consecutive_failures', 'path', 'port_index', 'port', 'protocol'):
+            for field, output_field in self.HEALTH_CHECK_FIELDS:
                 if check[field] is not None:
-                    tmp_check[underscore_to_camelcase(field)] = check[field]
+                    tmp_check[output_field] = check[field]
             if check['command'] is not None:
                 tmp_check.update(dict(
                     protocol='COMMAND',
@@ -503,23 +544,24 @@ class OutputPlugin(OutputPluginBase):
             # Render templates now so that loop vars can be used
             tmp_check = self._template.render_template(tmp_check, tmp_vars)
             health_checks.append(tmp_check)
+        self.clear_loop_vars(tmp_vars, 'check')
         if health_checks:
             data['healthChecks'] = health_checks
 
     def build_upgrade_strategy(self, app_vars, data):
         strategy = {}
         app_vars_section = app_vars['APP']['upgrade_strategy']
-        for field in ('minimum_health_capacity', 'maximum_over_capacity'):
+        for field, output_field in self.UPGRADE_STRATEGY_FIELDS:
             if app_vars_section[field] is not None:
-                strategy[underscore_to_camelcase(field)] = float(app_vars_section[field])
+                strategy[output_field] = float(app_vars_section[field])
         if strategy:
             data['upgradeStrategy'] = strategy
 
     def build_unreachable_strategy(self, app_vars, data):
         strategy = {}
         app_vars_section = app_vars['APP']['unreachable_strategy']
-        for field in ('inactive_after_seconds', 'expunge_after_seconds'):
+        for field, output_field in self.UNREACHABLE_STRATEGY_FIELDS:
             if app_vars_section[field] is not None:
-                strategy[underscore_to_camelcase(field)] = int(app_vars_section[field])
+                strategy[output_field] = int(app_vars_section[field])
         if strategy:
             data['unreachableStrategy'] = strategy
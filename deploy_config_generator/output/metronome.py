@@ -1,5 +1,6 @@
 from deploy_config_generator.utils import json_dump
 from deploy_config_generator.output import OutputPluginBase
+from deploy_config_generator.template import RE_TEMPLATE_MARKER
 
 
 class OutputPlugin(OutputPluginBase):
@@ -8,6 +9,12 @@ class OutputPlugin(OutputPluginBase):
     DESCR = 'Metronome output plugin'
     FILE_EXT = '.json'
 
+    # Conversion functions for numeric field types
+    NUMERIC_TYPES = {
+        'int': int,
+        'float': float,
+    }
+
     DEFAULT_CONFIG = {
         'fields': {
             'jobs': {
@@ -72,9 +79,9 @@ class OutputPlugin(OutputPluginBase):
         data = {
             'id': '{{ APP.id }}',
             'run': {
-                'cpus': '{{ APP.cpus | output_float }}',
-                'mem': '{{ APP.mem | output_int }}',
-                'disk': '{{ APP.disk | output_int }}',
+                'cpus': self.build_numeric_field(app_vars, 'cpus', 'float'),
+                'mem': self.build_numeric_field(app_vars, 'mem', 'int'),
+                'disk': self.build_numeric_field(app_vars, 'disk', 'int'),
                 'cmd': '{{ APP.cmd }}',
             }
         }
@@ -108,6 +115,18 @@ class OutputPlugin(OutputPluginBase):
         output = json_dump(self._template.render_template(data, app_vars))
         return output
 
+    def build_numeric_field(self, app_vars, field, field_type):
+        '''
+        Build the output value for a numeric field
+
+        Values are converted directly, unless they contain a template. In that case,
+        the output_* filter is used to convert the value after it's been rendered
+        '''
+        value = app_vars['APP'][field]
+        if isinstance(value, str) and RE_TEMPLATE_MARKER.search(value):
+            return '{{ APP.%s | output_%s }}' % (field, field_type)
+        return self.NUMERIC_TYPES[field_type](str(value))
+
     def build_secrets(self, app_vars, data):
         if app_vars['APP']['secrets']:
             secrets = {}
@@ -138,12 +157,16 @@ class OutputPlugin(OutputPluginBase):
             tmp_vars = app_vars.copy()
             artifacts_config = []
             for artifact_index, artifact in enumerate(app_vars['APP']['artifacts']):
-                tmp_vars.update(dict(artifact=artifact, artifact_index=artifact_index))
-                if not ('condition' in artifact) or self._template.evaluate_condition(artifact['condition'], tmp_vars):
-                    tmp_artifact = artifact.copy()
-                    if 'condition' in tmp_artifact:
-                        del tmp_artifact['condition']
-                    artifacts_config.append(tmp_artifact)
+                if 'condition' in artifact:
+                    # Loop vars are only needed for evaluating the condition
+                    tmp_vars['artifact'] = artifact
+                    tmp_vars['artifact_index'] = artifact_index
+                    if not self._template.evaluate_condition(artifact['condition'], tmp_vars):
+                        continue
+                tmp_artifact = artifact.copy()
+                if 'condition' in tmp_artifact:
+                    del tmp_artifact['condition']
+                artifacts_config.append(tmp_artifact)
             if artifacts_config:
                 data['run']['artifacts'] = artifacts_config
 
@@ -152,11 +175,15 @@ class OutputPlugin(OutputPluginBase):
             tmp_vars = app_vars.copy()
             schedules_config = []
             for schedule_index, schedule in enumerate(app_vars['APP']['schedules']):
-                tmp_vars.update(dict(schedule=schedule, schedule_index=schedule_index))
-                if not ('condition' in schedule) or self._template.evaluate_condition(schedule['condition'], tmp_vars):
-                    tmp_schedule = schedule.copy()
-                    if 'condition' in tmp_schedule:
-                        del tmp_schedule['condition']
-                    schedules_config.append(tmp_schedule)
+                if 'condition' in schedule:
+                    # Loop vars are only needed for evaluating the condition
+                    tmp_vars['schedule'] = schedule
+                    tmp_vars['schedule_index'] = schedule_index
+                    if not self._template.evaluate_condition(schedule['condition'], tmp_vars):
+                        continue
+                tmp_schedule = schedule.copy()
+                if 'condition' in tmp_schedule:
+                    del tmp_schedule['condition']
+                schedules_config.append(tmp_schedule)
             if schedules_config:
                 data['schedules'] = schedules_config
@@ -1,3 +1,4 @@
+import functools
 import jinja2
 import json
 import re
@@ -6,6 +7,24 @@ from deploy_config_generator.errors import TemplateUndefinedError
 
 OMIT_TOKEN = '__OMIT__TOKEN__'
 
+# Matches the start of a Jinja expression or statement
+RE_TEMPLATE_MARKER = re.compile(r'\{[{%]')
+# Matches anything that Jinja would change when rendering a string: the start of
+# an expression, statement, or comment, or a carriage return (newlines are
+# normalized)
+RE_TEMPLATE_SYNTAX = re.compile(r'\{[{%#]|\r')
+
+# Compiled Python code for template sources, shared between all Template instances
+# (whose Jinja environments are configured identically). This serves the same
+# purpose as Jinja's bytecode cache, which isn't used for templates created with
+# from_string(). Entries are kept in least-recently-used order, so that the oldest
+# can be dropped once the cache is full
+COMPILED_CODE_CACHE = {}
+COMPILED_CODE_CACHE_SIZE = 4096
+
+# Shared encoder for the to_json filter when called without extra options
+JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+
 
 class UnsafeText(str):
 
@@ -34,6 +53,24 @@ class Template(object):
         self._env = jinja2.Environment(finalize=self.finalize, undefined=jinja2.StrictUndefined, keep_trailing_newline=True)
         self._env.filters.update(FILTERS)
         self._env.globals.update(GLOBALS)
+        # Cache compiled templates by source, since the same strings (such as
+        # '{{ APP.id }}') get rendered over and over. This lives on the instance
+        # so that it's released along with the Environment
+        self._compile = functools.lru_cache(maxsize=1024)(self.compile_template)
+
+    def compile_template(self, source):
+        '''
+        This function creates a Jinja template object from the template source,
+        reusing the compiled code from other Template instances where possible
+        '''
+        code = COMPILED_CODE_CACHE.pop(source, None)
+        if code is None:
+            code = self._env.compile(source)
+            if len(COMPILED_CODE_CACHE) >= COMPILED_CODE_CACHE_SIZE:
+                del COMPILED_CODE_CACHE[next(iter(COMPILED_CODE_CACHE))]
+        # (Re-)insert the entry to mark it as most recently used
+        COMPILED_CODE_CACHE[source] = code
+        return self._env.template_class.from_code(self._env, code, self._env.make_globals(None))
 
     @jinja2_contextfunction
     def finalize(self, context, value):
@@ -42,9 +79,8 @@ class Template(object):
         us to do recursive templating of vars (vars referencing other vars)
         '''
         # If the value appears to contain a template, render it and return the result
-        if self._recursive and isinstance(value, str):
-            if '{{' in value or '{%' in value:
-                return context.environment.from_string(value).render(context)
+        if self._recursive and isinstance(value, str) and RE_TEMPLATE_MARKER.search(value):
+            return self._compile(value).render(context)
 
         return value
 
@@ -53,84 +89,111 @@ class Template(object):
         This function looks for a type header/footer (as added by the various output_*
         Jinja filters) and converts as necessary
         '''
-        if isinstance(value, str):
-            # This regex looks for a value like '__int__whatever__int__' and captures
-            # the value in the middle
-            matches = re.match(r'^__(?P<type>[a-z]+)__(.*)__(?P=type)__$', value)
-            if matches:
-                value_type = matches.group(1)
-                if value_type == 'int':
-                    return int(matches.group(2))
-                if value_type == 'float':
-                    return float(matches.group(2))
-                if value_type == 'bool':
-                    if matches.group(2).lower() == 'true':
-                        return True
-                    return False
-                if value_type == 'complex':
-                    # Parse python complex type from serialized format
-                    return eval(matches.group(2))
+        # All type markers start with '__', so we can cheaply skip most values
+        if isinstance(value, str) and value.startswith('__'):
+            # Ignore a single trailing newline
+            tmp_value = value[:-1] if value.endswith('\n') else value
+            for marker, convert in TYPE_MARKERS.items():
+                # Look for a value like '__int__whatever__int__' and convert the
+                # value in the middle
+                if len(tmp_value) >= len(marker) * 2 and tmp_value.startswith(marker) and tmp_value.endswith(marker):
+                    inner = tmp_value[len(marker):-len(marker)]
+                    if '\n' not in inner:
+                        return convert(inner)
         return value
 
     def render_template(self, template, args=None):
         '''
-        This function will recursively render templates in strings, dicts, and lists
+        This function will render templates in strings, dicts, and lists (including
+        nested dicts and lists)
         '''
         if args is None:
             args = self._default_vars
-        if isinstance(template, UnsafeText):
-            return template
         if isinstance(template, dict):
             ret = {}
-            for k, v in template.items():
-                v = self.type_fixup(self.render_template(v, args))
-                if v == OMIT_TOKEN:
-                    continue
-                ret[k] = v
-            return ret
         elif isinstance(template, (list, tuple)):
             ret = []
-            for i, v in enumerate(template):
-                v = self.type_fixup(self.render_template(v, args))
-                if v == OMIT_TOKEN:
-                    continue
-                ret.append(v)
-            return ret
-        elif isinstance(template, str):
+        else:
+            return self.render_string(template, args)
+        # Walk nested dicts/lists using a stack rather than recursion. Each entry
+        # is an iterator over the items of a source container and the output container
+        # to populate from it, which has already been placed in its parent. When a
+        # nested container is found, it's processed before resuming the current one,
+        # so that values are rendered in document order
+        stack = [(iter(template.items()) if isinstance(ret, dict) else enumerate(template), ret)]
+        while stack:
+            items, dest = stack[-1]
+            dest_is_dict = isinstance(dest, dict)
+            for k, v in items:
+                # Plain strings are by far the most common value, so check for them
+                # first with a cheap exact type check
+                if type(v) is str or not isinstance(v, (dict, list, tuple)):
+                    v = self.type_fixup(self.render_string(v, args))
+                    if v == OMIT_TOKEN:
+                        continue
+                    child = None
+                elif isinstance(v, dict):
+                    child = (iter(v.items()), {})
+                    v = child[1]
+                else:
+                    child = (enumerate(v), [])
+                    v = child[1]
+                if dest_is_dict:
+                    dest[k] = v
+                else:
+                    dest.append(v)
+                if child is not None:
+                    stack.append(child)
+                    break
+            else:
+                # All items in this container have been processed
+                stack.pop()
+        return ret
+
+    def render_string(self, template, args):
+        '''
+        This function renders a single (non-container) value
+        '''
+        if isinstance(template, str) and not isinstance(template, UnsafeText):
+            # Strings without any template syntax would come out of Jinja unchanged,
+            # so don't bother compiling/rendering them
+            if not RE_TEMPLATE_SYNTAX.search(template):
+                return template
             try:
-                return self._env.from_string(template).render(**args)
+                return self._compile(template).render(**args)
             except jinja2.exceptions.UndefinedError as e:
                 raise TemplateUndefinedError('undefined value: %s in template: %s' % (str(e), template))
-        else:
-            return template
+        return template
 
     def evaluate_condition(self, condition, tmp_vars):
         '''
         This function uses Jinja to evaluate a conditional statement
         '''
-        ret = self._env.from_string('{% if ' + condition + ' %}True{% else %}False{% endif %}').render(**tmp_vars)
+        ret = self._compile('{% if ' + condition + ' %}True{% else %}False{% endif %}').render(**tmp_vars)
         if ret == 'True':
             return True
         return False
 
 
 def filter_output_int(arg):
-    return '__int__' + str(arg) + '__int__'
+    return f'__int__{arg}__int__'
 
 
 def filter_output_float(arg):
-    return '__float__' + str(arg) + '__float__'
+    return f'__float__{arg}__float__'
 
 
 def filter_output_bool(arg):
-    return '__bool__' + str(arg) + '__bool__'
+    return f'__bool__{arg}__bool__'
 
 
 def filter_output_complex(arg):
-    return '__complex__' + str(arg) + '__complex__'
+    return f'__complex__{arg}__complex__'
 
 
 def filter_to_json(arg, **args):
+    if not args:
+        return JSON_ENCODER.encode(arg)
     return json.dumps(arg, sort_keys=True, **args)
 
 
@@ -139,7 +202,8 @@ def filter_to_nice_json(arg, indent=2, prefix_indent=None, **args):
     # Add extra indentation to all lines to account for being embedded in a
     # larger JSON document
     if prefix_indent:
-        out = '\n'.join([ (' ' * prefix_indent) + line for line in out.split('\n') ])
+        pad = ' ' * prefix_indent
+        out = pad + out.replace('\n', '\n' + pad)
     return out
 
 
@@ -167,6 +231,15 @@ def evaluate_condition(context, condition, **kwargs):
     return False
 
 
+# Type header/footer markers and the functions to convert the value between them
+TYPE_MARKERS = {
+    '__int__': int,
+    '__float__': float,
+    '__bool__': lambda value: value.lower() == 'true',
+    # Parse python complex type from serialized format
+    '__complex__': eval,
+}
+
 FILTERS = {
     'output_int': filter_output_int,
     'output_float': filter_output_float,
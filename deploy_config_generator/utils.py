@@ -1,10 +1,23 @@
 import json
 import re
 import traceback
-import yaml
 
 from deploy_config_generator.template import UnsafeText
 
+# Matches an underscore followed by a letter (for converting to camel case)
+RE_CAMELCASE_BOUNDARY = re.compile(r'_[a-zA-Z]')
+
+# Default options for json_dump(), and a shared encoder for calls that use them
+JSON_SORT_KEYS = True
+JSON_INDENT = 2
+JSON_SEPARATORS = (',', ': ')
+JSON_ENCODER = json.JSONEncoder(sort_keys=JSON_SORT_KEYS, indent=JSON_INDENT, separators=JSON_SEPARATORS)
+
+# PyYAML is imported and configured on first use (see init_yaml()), so that it
+# isn't loaded for things like --help
+yaml = None
+YAML_LOADER = None
+
 
 class objdict(dict):
 
@@ -81,6 +94,34 @@ def show_traceback(verbosity=0):
         print()
 
 
+def init_yaml():
+    '''
+    Import and configure PyYAML, if it hasn't been already
+    '''
+    global yaml, YAML_LOADER
+    if YAML_LOADER is not None:
+        return
+    import yaml
+    # Override boolean definition for YAML dumper to properly quote Y/N values
+    # This is needed because PyYAML doesn't consider Y/N as boolean values (which
+    # deviates from the YAML spec), so it doesn't quote them when dumping, but
+    # kubectl does consider them boolean values, so it misinterprets YAML generated
+    # by this tool with those string values as being boolean values
+    yaml.resolver.Resolver.add_implicit_resolver(
+        u'tag:yaml.org,2002:bool',
+        re.compile(r'^(?:y|Y|n|N|yes|Yes|YES|no|No|NO|true|True|TRUE|false|False|FALSE|on|On|ON|off|Off|OFF)$', re.X),
+        list(u'yYnNtTfFoO')
+    )
+    # Use the LibYAML-based loader when PyYAML was built with it, since it's much
+    # faster than the pure-Python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    # Register constructor for values tagged with !unsafe
+    loader.add_constructor(
+        u'!unsafe',
+        construct_yaml_unsafe)
+    YAML_LOADER = loader
+
+
 def represent_yaml_unsafe(dumper, value):
     '''
     YAML representer for UnsafeText
@@ -94,6 +135,7 @@ def yaml_dump(value, **kwargs):
     '''
     Utility function for dumping a value to YAML
     '''
+    init_yaml()
     dumper = yaml.SafeDumper
     dumper.add_representer(UnsafeText, represent_yaml_unsafe)
     return yaml.dump(value, Dumper=dumper, default_flow_style=False, **kwargs)
@@ -104,7 +146,7 @@ def construct_yaml_unsafe(loader, node):
     YAML constructor function for values tagged with !unsafe
     '''
     if loader is None:
-        loader = yaml.SafeLoader
+        loader = YAML_LOADER
     try:
         constructor = getattr(node, 'id', 'object')
         if constructor is not None:
@@ -141,17 +183,16 @@ def yaml_load(value, **kwargs):
     '''
     Utility function for loading a value from YAML
     '''
-    loader = yaml.SafeLoader
-    loader.add_constructor(
-        u'!unsafe',
-        construct_yaml_unsafe)
-    return yaml.load(value, Loader=loader, **kwargs)
+    init_yaml()
+    return yaml.load(value, Loader=YAML_LOADER, **kwargs)
 
 
-def json_dump(value, sort_keys=True, indent=2, separators=(',', ': '), **kwargs):
+def json_dump(value, sort_keys=JSON_SORT_KEYS, indent=JSON_INDENT, separators=JSON_SEPARATORS, **kwargs):
     '''
     Utility function for dumping a value to JSON
     '''
+    if not kwargs and (sort_keys, indent, separators) == (JSON_SORT_KEYS, JSON_INDENT, JSON_SEPARATORS):
+        return JSON_ENCODER.encode(value)
     return json.dumps(value, sort_keys=sort_keys, indent=indent, separators=separators, **kwargs)
 
 
@@ -181,19 +222,12 @@ def underscore_to_camelcase(value):
     This converts 'foo_bar_baz' (the standard for this app) to
     'fooBarBaz' (the standard for Marathon and Kubernetes)
     '''
-    def replacer(match):
-        # Grab the last character of the match and upper-case it
-        return match.group(0)[-1].upper()
-    return re.sub(r'_[a-zA-Z]', replacer, value)
-
-
-# Override boolean definition for YAML dumper to properly quote Y/N values
-# This is needed because PyYAML doesn't consider Y/N as boolean values (which
-# deviates from the YAML spec), so it doesn't quote them when dumping, but
-# kubectl does consider them boolean values, so it misinterprets YAML generated
-# by this tool with those string values as being boolean values
-yaml.resolver.Resolver.add_implicit_resolver(
-    u'tag:yaml.org,2002:bool',
-    re.compile(r'^(?:y|Y|n|N|yes|Yes|YES|no|No|NO|true|True|TRUE|false|False|FALSE|on|On|ON|off|Off|OFF)$', re.X),
-    list(u'yYnNtTfFoO')
-)
+    return RE_CAMELCASE_BOUNDARY.sub(camelcase_replacer, value)
+
+
+def camelcase_replacer(match):
+    '''
+    Replacement function for underscore_to_camelcase()
+    '''
+    # Grab the last character of the match and upper-case it
+    return match.group(0)[-1].upper()
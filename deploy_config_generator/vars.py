@@ -1,3 +1,4 @@
+import itertools
 import re
 
 from deploy_config_generator.errors import VarsParseError, VarsReplacementError
@@ -17,6 +18,12 @@ QUOTE_TOKENS = (SINGLE_QUOTE_TOKEN, DOUBLE_QUOTE_TOKEN)
 # Must start with letter/underscore and contain only letter/number/underscore
 RE_VAR_NAME = r'([A-Za-z_][A-Za-z0-9_]*)'
 
+# Regex for var references
+# The first capture group (named 'curly') looks for an opening curly brace, and
+# the last capture group looks for a closing curly brace *if* the first capture
+# group matched anything
+RE_VAR_REFERENCE = re.compile(r'\$(?P<curly>\{)?%s(?(curly)\})' % RE_VAR_NAME)
+
 ESCAPE_SEQUENCES = {
     r'\"': '"',
     r'\n': '\n',
@@ -63,13 +70,12 @@ class Vars(dict):
                 ret[item] = self.replace_vars(value[item])
         elif isinstance(value, str):
             ret = value
-            # Find and Replace var references
-            # The first capture group (named 'curly') looks for an opening curly brace, and
-            # the last capture group looks for a closing curly brace *if* the first capture
-            # group matched anything
-            ret = re.sub(r'\$(?P<curly>\{)?%s(?(curly)\})' % RE_VAR_NAME, replace_var, ret)
-            if isinstance(value, UnsafeText):
-                ret = UnsafeText(ret)
+            # Find and Replace var references, skipping the regex entirely for the
+            # (common) case of a string without any
+            if '$' in ret:
+                ret = RE_VAR_REFERENCE.sub(replace_var, ret)
+                if isinstance(value, UnsafeText):
+                    ret = UnsafeText(ret)
         else:
             ret = value
 
@@ -106,7 +112,9 @@ class VarsParser(object):
         self.var_name += token
 
     def add_token_to_var_value(self, token):
-        self.var_value += token
+        # The value is collected as a list of tokens and joined in finalize_var(),
+        # to avoid repeatedly copying the value string for every character
+        self.var_value.append(token)
 
     def process_var_name(self, token):
         '''
@@ -119,7 +127,7 @@ class VarsParser(object):
             if self.var_name is None:
                 raise VarsParseError("Encountered '=' before var name", path=self.path, line=self.lineno)
             self.found_equals = True
-            self.var_value = ''
+            self.var_value = []
             return
         else:
             # Consider any tokens before the = to be the var name
@@ -133,7 +141,7 @@ class VarsParser(object):
         '''
         Process what should be the variable value
         '''
-        if token in QUOTE_TOKENS and not self.var_value.endswith('\\'):
+        if token in QUOTE_TOKENS and not (self.var_value and self.var_value[-1] == '\\'):
             if self.in_quotes:
                 if token == self.in_quotes:
                     self.in_quotes = None
@@ -178,6 +186,7 @@ class VarsParser(object):
         '''
         Process escape sequences, replace variable references, and save var
         '''
+        self.var_value = ''.join(self.var_value)
         try:
             # Process escape sequences
             if self.found_escape:
@@ -196,7 +205,7 @@ class VarsParser(object):
         '''
         data = self.fh.read()
         # Iterate over each char in input, plus EOF
-        for token in (list(data) + [EOF_TOKEN]):
+        for token in itertools.chain(data, [EOF_TOKEN]):
             if token in SKIP_TOKENS:
                 continue
             # Increment line number when encountering a newline
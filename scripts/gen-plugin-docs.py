@@ -61,21 +61,32 @@ def load_output_plugins(varset):
     plugins = []
     for plugin_dir in (output_ns.__path__ + SITE_CONFIG.plugin_dirs):
         DISPLAY.vv('Looking in plugin dir %s' % plugin_dir)
-        sys.path.insert(0, plugin_dir)
+        # Built-in plugins are imported as part of our package, the same as in
+        # discover_plugin_classes() in deploy_config_generator.__main__
+        builtin = (plugin_dir in output_ns.__path__)
+        if not builtin:
+            sys.path.insert(0, plugin_dir)
         for finder, name, ispkg in pkgutil.iter_modules([plugin_dir]):
+            # Modules with a leading underscore are helpers rather than plugins
+            if name.startswith('_'):
+                continue
             try:
-                mod = importlib.import_module(name)
+                if builtin:
+                    mod = importlib.import_module('%s.%s' % (output_ns.__name__, name))
+                else:
+                    mod = importlib.import_module(name)
                 cls = getattr(mod, 'OutputPlugin')
                 DISPLAY.v('Loading plugin %s' % cls.NAME)
                 plugins.append(cls(varset, '', None))
             except ConfigError as e:
-                DISPLAY.display('Plugin configuration error: %s: %s' % (cls.NAME, str(e)))
+                DISPLAY.display('Plugin configuration error: %s: %s' % (name, str(e)))
                 sys.exit(1)
             except Exception as e:
                 show_traceback(DISPLAY.get_verbosity())
-                DISPLAY.display('Failed to load output plugin %s: %s' % (cls.NAME, str(e)))
+                DISPLAY.display('Failed to load output plugin %s: %s' % (name, str(e)))
                 sys.exit(1)
-        sys.path.pop(0)
+        if not builtin:
+            sys.path.pop(0)
     # Return list of plugins sorted by priority (highest to lowest) and name (Z-A, because
     # we reverse the sort)
     return sorted(plugins, reverse=True)
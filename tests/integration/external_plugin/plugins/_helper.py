@@ -0,0 +1,3 @@
+# Helper module for the dummy2 plugin. This isn't an output plugin itself, so it
+# must be skipped during plugin discovery due to the leading underscore
+TEMPLATE_HEADER = 'Dummy2 output plugin'
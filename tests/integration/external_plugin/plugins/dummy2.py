@@ -3,6 +3,8 @@ import inspect
 from deploy_config_generator.utils import json_dump
 from deploy_config_generator.output import OutputPluginBase
 
+from _helper import TEMPLATE_HEADER
+
 
 class OutputPlugin(OutputPluginBase):
 
@@ -23,8 +25,7 @@ class OutputPlugin(OutputPluginBase):
         }
     }
 
-    TEMPLATE = '''
-    Dummy2 output plugin
+    TEMPLATE = TEMPLATE_HEADER + '''
 
     App config:
     '''
@@ -1,6 +1,10 @@
 import inspect
+import jinja2
 import unittest
+from unittest import mock
 
+from deploy_config_generator import template
+from deploy_config_generator.errors import TemplateUndefinedError
 from deploy_config_generator.template import Template
 
 
@@ -47,3 +51,93 @@ class TestTemplate (unittest.TestCase):
         output = self._template.render_template(inspect.cleandoc(tpl), my_vars)
 
         self.assertEqual(output, '{"bar": ["item 1", "item 2"]}')
+
+    def test_template_compile_cache(self):
+        tpl = '''
+        foo {{ bar }}
+        '''
+        output1 = self._template.render_template(inspect.cleandoc(tpl), { 'bar': 'one' })
+        output2 = self._template.render_template(inspect.cleandoc(tpl), { 'bar': 'two' })
+
+        self.assertEqual(output1, 'foo one')
+        self.assertEqual(output2, 'foo two')
+        self.assertEqual(self._template._compile.cache_info().hits, 1)
+
+    def test_template_recursive_vars(self):
+        tpl = '''
+        {{ foo }} {{ baz }}
+        '''
+        my_vars = { 'foo': '{{ bar }}', 'bar': 'whatever', 'baz': 'plain { text }' }
+        output = self._template.render_template(inspect.cleandoc(tpl), my_vars)
+
+        self.assertEqual(output, 'whatever plain { text }')
+
+    def test_template_type_fixup(self):
+        self.assertEqual(self._template.type_fixup('__int__12__int__'), 12)
+        self.assertEqual(self._template.type_fixup('__float__1.5__float__\n'), 1.5)
+        self.assertIs(self._template.type_fixup('__bool__True__bool__'), True)
+        self.assertIs(self._template.type_fixup('__bool__no__bool__'), False)
+        self.assertEqual(self._template.type_fixup('__complex__(1+2j)__complex__'), complex(1, 2))
+        for value in ('__int__', '__int__12__float__', '__foo__bar__foo__', '__int__1\n2__int__', 'plain'):
+            self.assertEqual(self._template.type_fixup(value), value)
+
+    def test_template_nested(self):
+        tpl = {
+            'foo': '{{ bar }}',
+            'items': [
+                { 'num': '{{ num | output_int }}', 'omitted': '{{ omit }}' },
+                ('{{ bar }}', '{{ omit }}', 3),
+            ],
+            'nested': { 'deeper': { 'value': '{{ flag | output_bool }}' } },
+        }
+        my_vars = { 'bar': 'whatever', 'num': 5, 'flag': True }
+        output = self._template.render_template(tpl, my_vars)
+
+        self.assertEqual(output, {
+            'foo': 'whatever',
+            'items': [
+                { 'num': 5 },
+                ['whatever', 3],
+            ],
+            'nested': { 'deeper': { 'value': True } },
+        })
+
+    def test_template_nested_order(self):
+        # Values should be rendered in document order, so that the first undefined
+        # var is the one reported
+        tpl = { 'a': { 'x': ['{{ first }}'] }, 'b': '{{ second }}' }
+        with self.assertRaisesRegex(TemplateUndefinedError, "'first' is undefined"):
+            self._template.render_template(tpl, {})
+
+    def test_template_no_syntax(self):
+        for tpl in ('plain text', 'foo {bar} ${baz}\n', '{ "foo": 1 }'):
+            self.assertEqual(self._template.render_template(tpl, {}), tpl)
+        self.assertEqual(self._template.render_template('foo {# comment #}bar\r\n', {}), 'foo bar\n')
+        self.assertEqual(self._template._compile.cache_info().currsize, 1)
+
+    def test_template_shared_code(self):
+        tpl = '{{ foo }} shared'
+        output1 = self._template.render_template(tpl, { 'foo': 'one' })
+        with mock.patch.object(jinja2.Environment, 'compile') as mock_compile:
+            output2 = Template().render_template(tpl, { 'foo': 'two' })
+
+        self.assertEqual(output1, 'one shared')
+        self.assertEqual(output2, 'two shared')
+        self.assertEqual(mock_compile.call_count, 0)
+
+    def test_template_shared_code_size(self):
+        with mock.patch.object(template, 'COMPILED_CODE_CACHE', {}) as cache, \
+                mock.patch.object(template, 'COMPILED_CODE_CACHE_SIZE', 2):
+            for tpl in ('{{ a }}', '{{ b }}', '{{ a }}', '{{ c }}'):
+                Template().render_template(tpl, { 'a': 1, 'b': 2, 'c': 3 })
+
+            self.assertEqual(list(cache.keys()), ['{{ a }}', '{{ c }}'])
+
+    def test_template_filter_to_nice_json_prefix_indent(self):
+        tpl = '''
+        {{ foo | to_nice_json(prefix_indent=4) }}
+        '''
+        my_vars = { 'foo': { 'bar': ['item 1'] } }
+        output = self._template.render_template(inspect.cleandoc(tpl), my_vars)
+
+        self.assertEqual(output, '    {\n      "bar": [\n        "item 1"\n      ]\n    }')
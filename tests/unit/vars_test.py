@@ -8,7 +8,8 @@ except ImportError:
     from io import StringIO
 
 from deploy_config_generator.vars import Vars, VarsParser
-from deploy_config_generator.errors import VarsParseError
+from deploy_config_generator.errors import VarsParseError, VarsReplacementError
+from deploy_config_generator.template import UnsafeText
 
 
 class TestVars (unittest.TestCase):
@@ -113,6 +114,15 @@ class TestVars (unittest.TestCase):
 
         self.assertEqual(dict(my_vars), { 'FOO': 'bar', 'BAR': 'bar' })
 
+    def test_var_replacement_nested(self):
+        my_vars = Vars(FOO='bar', NUM=3)
+        output = my_vars.replace_vars({ 'a': ['$FOO', 'x${NUM}y', 'plain', 5], 'b': UnsafeText('${FOO}') })
+
+        self.assertEqual(output, { 'a': ['bar', 'x3y', 'plain', 5], 'b': 'bar' })
+        self.assertIsInstance(output['b'], UnsafeText)
+        with self.assertRaisesRegex(VarsReplacementError, "Unknown variable 'BAZ'"):
+            my_vars.replace_vars('foo $BAZ')
+
     def test_parse_errors_1(self):
         vars_content = '''
         FOO=bar baz